@@ -1,9 +1,16 @@
+import base64
 import datetime
+import io
+from concurrent.futures import Future, ThreadPoolExecutor
 
-import pandas as pd
+import numpy as np
+import orjson
 import plotly.graph_objects as go
 import requests
 import streamlit as st
+from PIL import Image
+
+_Figure, _Indicator, _Scattergl = go.Figure, go.Indicator, go.Scattergl
 
 # ---------------------------------------------------------------------------
 # Page config
@@ -23,51 +30,121 @@ RATING_COLORS = {
     "Extreme Greed": "#2e7d32",
 }
 
-GAUGE_STEPS = [
-    {"range": [0, 25], "color": "#d32f2f"},
-    {"range": [25, 45], "color": "#f57c00"},
-    {"range": [45, 55], "color": "#fdd835"},
-    {"range": [55, 75], "color": "#7cb342"},
-    {"range": [75, 100], "color": "#2e7d32"},
-]
+GAUGE_STEPS = tuple(
+    {"range": (lo, hi), "color": color}
+    for lo, hi, color in (
+        (0, 25, "#d32f2f"),
+        (25, 45, "#f57c00"),
+        (45, 55, "#fdd835"),
+        (55, 75, "#7cb342"),
+        (75, 100, "#2e7d32"),
+    )
+)
+
+# History series longer than this are downsampled before plotting.
+HISTORY_MAX_POINTS = 800
+HISTORY_TARGET_POINTS = 600
+
+
+# Upper bound (inclusive) of each rating band, and the labels they map to.
+_THRESH = np.array([25, 45, 55, 75])
+_LABELS = np.array(["Extreme Fear", "Fear", "Neutral", "Greed", "Extreme Greed"])
 
 
 def _rating_label(score: float) -> str:
-    if score <= 25:
-        return "Extreme Fear"
-    if score <= 45:
-        return "Fear"
-    if score <= 55:
-        return "Neutral"
-    if score <= 75:
-        return "Greed"
-    return "Extreme Greed"
+    return str(_LABELS[np.searchsorted(_THRESH, score, side="left")])
+
+
+def _rating_labels(scores: np.ndarray) -> np.ndarray:
+    """Vectorised ``_rating_label`` for an array of scores."""
+    return _LABELS[np.searchsorted(_THRESH, scores, side="left")]
+
+
+@st.cache_resource
+def _session() -> requests.Session:
+    """Return a shared HTTP session so connections are reused across fetches."""
+    session = requests.Session()
+    session.headers.update(
+        {
+            "User-Agent": (
+                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                "AppleWebKit/537.36 (KHTML, like Gecko) "
+                "Chrome/120.0.0.0 Safari/537.36"
+            ),
+            "Accept-Encoding": "gzip, deflate",
+        }
+    )
+    session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=2))
+    return session
 
 
-@st.cache_data(ttl=300)
-def fetch_fear_greed_data() -> dict | None:
-    """Fetch Fear & Greed data from CNN's API (cached 5 min)."""
+@st.cache_resource
+def _executor() -> ThreadPoolExecutor:
+    """Return the worker used to download CNN data off the script thread."""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="fear-greed-fetch")
+
+
+@st.cache_resource
+def _last_response() -> dict:
+    """Return the validators and payload of the last successful download."""
+    return {}
+
+
+def _download_fear_greed_data(session: requests.Session, last: dict) -> dict:
+    """Download and parse the CNN payload, raising on any failure.
+
+    Sends the previous response's ETag/Last-Modified so an unchanged payload
+    comes back as a bodiless 304 and the last parsed result is reused.
+    """
     start_date = (datetime.date.today() - datetime.timedelta(days=365)).isoformat()
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/120.0.0.0 Safari/537.36"
-        )
-    }
+    url = f"{CNN_API_URL}/{start_date}"
+
+    headers = {}
+    if last.get("url") == url:
+        if last.get("etag"):
+            headers["If-None-Match"] = last["etag"]
+        if last.get("last_modified"):
+            headers["If-Modified-Since"] = last["last_modified"]
+
+    resp = session.get(url, headers=headers, timeout=10)
+    if resp.status_code == 304 and "payload" in last:
+        return last["payload"]
+    resp.raise_for_status()
+
+    payload = orjson.loads(resp.content)
+    last.update(
+        url=url,
+        etag=resp.headers.get("ETag"),
+        last_modified=resp.headers.get("Last-Modified"),
+        payload=payload,
+    )
+    return payload
+
+
+@st.cache_resource(ttl=60)
+def prefetch_fear_greed_data() -> Future:
+    """Start downloading CNN data in the background (at most one per minute)."""
+    # Resolve cached resources here so the worker never touches Streamlit.
+    return _executor().submit(_download_fear_greed_data, _session(), _last_response())
+
+
+@st.cache_data(ttl=60)
+def fetch_fear_greed_data() -> dict | None:
+    """Fetch Fear & Greed data from CNN's API (cached 1 min)."""
     try:
-        resp = requests.get(f"{CNN_API_URL}/{start_date}", headers=headers, timeout=10)
-        resp.raise_for_status()
-        return resp.json()
+        return prefetch_fear_greed_data().result()
     except Exception as exc:
+        # Drop the failed download so the next cache miss retries.
+        prefetch_fear_greed_data.clear()
         st.error(f"Failed to fetch data from CNN: {exc}")
         return None
 
 
+@st.cache_data(ttl=300)
 def build_gauge(score: float, title: str = "Current Index") -> go.Figure:
-    """Return a Plotly gauge figure for the given score."""
-    fig = go.Figure(
-        go.Indicator(
+    """Return a Plotly gauge figure for the given score (cached 5 min)."""
+    fig = _Figure(
+        _Indicator(
             mode="gauge+number",
             value=score,
             number={"font": {"size": 52}},
@@ -88,22 +165,93 @@ def build_gauge(score: float, title: str = "Current Index") -> go.Figure:
     return fig
 
 
+@st.cache_data(ttl=300)
+def gauge_png(score: float) -> bytes | None:
+    """Return the gauge for ``score`` as PNG bytes, or None if export fails (cached 5 min)."""
+    try:
+        return build_gauge(score).to_image(format="png", width=500, height=280)
+    except Exception:
+        # Cache the failure as well so reruns don't retry a broken export
+        return None
+
+
+def format_timestamp(timestamp_ms: float) -> str:
+    """Return a CNN millisecond timestamp as a display string."""
+    dt = datetime.datetime.fromtimestamp(float(timestamp_ms) / 1000, tz=datetime.timezone.utc)
+    return dt.strftime("%b %d, %Y %H:%M UTC")
+
+
+def _lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> tuple[np.ndarray, np.ndarray]:
+    """Downsample a series to ``n_out`` points with Largest-Triangle-Three-Buckets."""
+    n = len(x)
+    if n_out < 3 or n <= n_out:
+        return x, y
+
+    xf = x.astype(np.float64)
+    yf = y.astype(np.float64)
+    # First and last points are always kept; the interior is split into
+    # n_out - 2 buckets and one point is picked from each.
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            avg_x = xf[hi : edges[i + 2]].mean()
+            avg_y = yf[hi : edges[i + 2]].mean()
+        else:
+            avg_x, avg_y = xf[-1], yf[-1]
+        area = np.abs(
+            (xf[a] - avg_x) * (yf[lo:hi] - yf[a]) - (xf[a] - xf[lo:hi]) * (avg_y - yf[a])
+        )
+        a = lo + int(area.argmax())
+        idx[i + 1] = a
+
+    return x[idx], y[idx]
+
+
+@st.cache_data
+def _sentiment_bands_image() -> str:
+    """Return a 1x100 PNG data URI shading each score unit by its sentiment band."""
+    # Row 0 is the top of the image (score 100); classify each row by its centre.
+    centres = 99.5 - np.arange(100)
+    band = np.searchsorted(_THRESH, centres, side="left")
+    palette = np.array(
+        [[int(step["color"][i : i + 2], 16) for i in (1, 3, 5)] + [18] for step in GAUGE_STEPS],
+        dtype=np.uint8,
+    )
+    buf = io.BytesIO()
+    Image.fromarray(palette[band].reshape(100, 1, 4), "RGBA").save(buf, format="PNG")
+    # Encode once here; a PIL source would be re-encoded on every figure build
+    return "data:image/png;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+
+
 def build_history_chart(data: dict) -> go.Figure | None:
     """Return a Plotly line chart of historical F&G values."""
     hist = data.get("fear_and_greed_historical", {}).get("data")
     if not hist:
         return None
+    return _build_history_figure(max(d["x"] for d in hist), len(hist), hist)
 
-    df = pd.DataFrame(hist)
-    df["date"] = pd.to_datetime(df["x"], unit="ms")
-    df.rename(columns={"y": "score"}, inplace=True)
-    df.sort_values("date", inplace=True)
 
-    fig = go.Figure()
+@st.cache_data(ttl=300)
+def _build_history_figure(last_ts: int, n_points: int, _hist: list) -> go.Figure:
+    """Build the history figure (cached on the payload's newest timestamp and size)."""
+    x = np.fromiter((int(d["x"]) for d in _hist), dtype=np.int64, count=n_points)
+    y = np.fromiter((d["y"] for d in _hist), dtype=np.float64, count=n_points)
+    order = np.argsort(x)
+    x, y = x[order], y[order]
+    if n_points > HISTORY_MAX_POINTS:
+        x, y = _lttb(x, y, HISTORY_TARGET_POINTS)
+    dates = x.astype("datetime64[ms]")
+
+    fig = _Figure()
     fig.add_trace(
-        go.Scatter(
-            x=df["date"],
-            y=df["score"],
+        _Scattergl(
+            x=dates,
+            y=y,
             mode="lines",
             line={"width": 2, "color": "#1f77b4"},
             fill="tozeroy",
@@ -112,13 +260,6 @@ def build_history_chart(data: dict) -> go.Figure | None:
         )
     )
 
-    # Sentiment bands
-    fig.add_hrect(y0=0, y1=25, fillcolor="#d32f2f", opacity=0.07, line_width=0)
-    fig.add_hrect(y0=25, y1=45, fillcolor="#f57c00", opacity=0.07, line_width=0)
-    fig.add_hrect(y0=45, y1=55, fillcolor="#fdd835", opacity=0.07, line_width=0)
-    fig.add_hrect(y0=55, y1=75, fillcolor="#7cb342", opacity=0.07, line_width=0)
-    fig.add_hrect(y0=75, y1=100, fillcolor="#2e7d32", opacity=0.07, line_width=0)
-
     fig.update_layout(
         title="Historical Fear & Greed Index (Past Year)",
         xaxis_title="Date",
@@ -127,6 +268,20 @@ def build_history_chart(data: dict) -> go.Figure | None:
         height=400,
         margin={"t": 50, "b": 40, "l": 50, "r": 20},
         hovermode="x unified",
+        # Sentiment bands as one stretched background image rather than shapes
+        images=[
+            {
+                "source": _sentiment_bands_image(),
+                "xref": "paper",
+                "yref": "y",
+                "x": 0,
+                "y": 100,
+                "sizex": 1,
+                "sizey": 100,
+                "sizing": "stretch",
+                "layer": "below",
+            }
+        ],
     )
     return fig
 
@@ -154,10 +309,35 @@ INDICATOR_KEYS = [
     ("junk_bond_demand", "Junk Bond Demand"),
 ]
 
+_CARD_CSS = (
+    "<style>"
+    ".fg-grid{display:grid; grid-template-columns:1fr 1fr; gap:12px;}"
+    ".fg-card{border:1px solid #ddd; border-radius:10px; padding:16px;}"
+    ".fg-head{display:flex; justify-content:space-between; align-items:center;}"
+    ".fg-badge{color:white; padding:2px 10px; border-radius:12px; font-size:0.85em;}"
+    ".fg-score{font-size:2em; font-weight:700; margin:6px 0;}"
+    ".fg-info{font-size:0.85em; color:#888;}"
+    "</style>"
+)
+
+_CARD_TMPL = (
+    '<div class="fg-card">'
+    '<div class="fg-head">'
+    "<strong>{label}</strong>"
+    '<span class="fg-badge" style="background:{color}">{rating}</span>'
+    "</div>"
+    '<div class="fg-score">{score:.1f}</div>'
+    '<div class="fg-info">{info}</div>'
+    "</div>"
+)
+
 
 # ---------------------------------------------------------------------------
 # Main UI
 # ---------------------------------------------------------------------------
+# Start the network request before rendering the header so the two overlap.
+prefetch_fear_greed_data()
+
 st.title("📊 CNN Fear & Greed Index Dashboard")
 st.caption("Real-time market sentiment powered by CNN's Fear & Greed Index")
 
@@ -182,18 +362,26 @@ color = RATING_COLORS.get(rating_display, "#666")
 
 last_updated = ""
 if timestamp_ms is not None:
-    try:
-        ts = float(timestamp_ms) / 1000
-        dt = datetime.datetime.utcfromtimestamp(ts)
-        last_updated = dt.strftime("%b %d, %Y %H:%M UTC")
-    except Exception:
-        last_updated = ""
+    # Reuse the formatted string across reruns until the timestamp changes
+    if st.session_state.get("_ts_key") != timestamp_ms:
+        try:
+            st.session_state["_ts_str"] = format_timestamp(timestamp_ms)
+        except Exception:
+            st.session_state["_ts_str"] = ""
+        st.session_state["_ts_key"] = timestamp_ms
+    last_updated = st.session_state["_ts_str"]
 
 # --- Layout: top row ---
 col_gauge, col_info = st.columns([1, 1])
 
 with col_gauge:
-    st.plotly_chart(build_gauge(current_score), use_container_width=True)
+    gauge_score = round(current_score, 1)
+    gauge_image = gauge_png(gauge_score)
+    if gauge_image is not None:
+        st.image(gauge_image, width="stretch")
+    else:
+        # Static export unavailable (e.g. no Chromium for kaleido); use the live chart
+        st.plotly_chart(build_gauge(gauge_score), width="stretch")
 
 with col_info:
     st.markdown("### Sentiment")
@@ -201,8 +389,14 @@ with col_info:
         f"<h1 style='color:{color}; margin:0;'>{rating_display}</h1>",
         unsafe_allow_html=True,
     )
-    delta = round(current_score - previous_close, 1)
-    st.metric(label="Score", value=f"{current_score:.1f}", delta=f"{delta:+.1f} vs prev close")
+    # Reuse the formatted metric strings across reruns until the scores change
+    fmt_key = (current_score, previous_close)
+    if st.session_state.get("_fmt_key") != fmt_key:
+        delta = round(current_score - previous_close, 1)
+        st.session_state["_fmt_key"] = fmt_key
+        st.session_state["_fmt_strs"] = (f"{current_score:.1f}", f"{delta:+.1f} vs prev close")
+    score_str, delta_str = st.session_state["_fmt_strs"]
+    st.metric(label="Score", value=score_str, delta=delta_str)
     if last_updated:
         st.caption(f"Last updated: {last_updated}")
 
@@ -230,42 +424,39 @@ else:
 st.divider()
 st.subheader("Component Indicators")
 
-# Build rows of indicator cards (2 per row for readability)
-cols_per_row = 2
-row_cols = st.columns(cols_per_row)
-col_idx = 0
-
+# Render all indicator cards (2 per row for readability) in a single element
+indicators = []
 for key, label in INDICATOR_KEYS:
     indicator = data.get(key, {})
-    if not indicator:
-        continue
+    if indicator and indicator.get("score") is not None:
+        indicators.append((label, indicator["score"], indicator.get("rating", "")))
 
-    score = indicator.get("score")
-    rating = indicator.get("rating", "")
-    if score is None:
-        continue
+# Classify every score in one pass; used when CNN's own rating is unusable
+fallback_ratings = _rating_labels(np.array([score for _, score, _ in indicators], dtype=float))
 
+parts = []
+for (label, score, rating), fallback_rating in zip(indicators, fallback_ratings):
     ind_rating = rating.replace("_", " ").title()
     if ind_rating not in RATING_COLORS:
-        ind_rating = _rating_label(score)
+        ind_rating = str(fallback_rating)
     ind_color = RATING_COLORS.get(ind_rating, "#666")
 
-    with row_cols[col_idx % cols_per_row]:
-        st.markdown(
-            f"""
-            <div style="border:1px solid #ddd; border-radius:10px; padding:16px; margin-bottom:12px;">
-                <div style="display:flex; justify-content:space-between; align-items:center;">
-                    <strong>{label}</strong>
-                    <span style="background:{ind_color}; color:white; padding:2px 10px;
-                                 border-radius:12px; font-size:0.85em;">{ind_rating}</span>
-                </div>
-                <div style="font-size:2em; font-weight:700; margin:6px 0;">{score:.1f}</div>
-                <div style="font-size:0.85em; color:#888;">{INDICATOR_INFO.get(label, "")}</div>
-            </div>
-            """,
-            unsafe_allow_html=True,
+    parts.append(
+        _CARD_TMPL.format_map(
+            {
+                "label": label,
+                "color": ind_color,
+                "rating": ind_rating,
+                "score": score,
+                "info": INDICATOR_INFO[label],
+            }
         )
-    col_idx += 1
+    )
+
+st.markdown(
+    _CARD_CSS + '<div class="fg-grid">' + "".join(parts) + "</div>",
+    unsafe_allow_html=True,
+)
 
 # --- Footer ---
 st.divider()